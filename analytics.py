@@ -1,56 +1,253 @@
-from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
 
+# The periodicities of a habit
+DAILY = "daily"
+WEEKLY = "weekly"
 
-def get_longest_run_streak(habits):
+# Ordinal of a Monday; calendar weeks are numbered by counting from it
+_WEEK_EPOCH = date(2001, 1, 1).toordinal()
+
+
+def _week_idx(day_ord):
+    """
+    Numbers the calendar week (starting Monday) a day falls into.
+    Consecutive weeks have consecutive numbers, also across year changes.
+
+    Args:
+        day_ord (int): The ordinal of the day (see date.toordinal()).
+
+    Returns:
+        int: The number of the week.
+    """
+    return (day_ord - _WEEK_EPOCH) // 7
+
+
+def _longest_run(keys):
+    """
+    Finds the longest run of consecutive integers in an ascending sequence.
+
+    Args:
+        keys (list[int]): Ascending period numbers (e.g. day ordinals).
+
+    Returns:
+        int: The length of the longest run, 0 for an empty sequence.
+    """
+    if not keys:
+        return 0
+    n = len(keys)
+    longest = current = 1
+    for i in range(1, n):
+        current = current + 1 if keys[i] - keys[i - 1] == 1 else 1
+        if current > longest:
+            longest = current
+        elif current + (n - 1 - i) <= longest:
+            break  # Even extending the current run to the end cannot beat the longest one
+    return longest
+
+
+def _longest_daily(day_ords):
+    """
+    Calculates the longest streak of a daily habit.
+
+    Args:
+        day_ords (list[int]): The day ordinals of the completions in ascending order.
+
+    Returns:
+        int: The longest streak.
+    """
+    # Consecutive days are consecutive day ordinals
+    return _longest_run(day_ords)
+
+
+def _longest_weekly(day_ords):
+    """
+    Calculates the longest streak of a weekly habit.
+
+    Args:
+        day_ords (list[int]): The day ordinals of the completions in ascending order.
+
+    Returns:
+        int: The longest streak.
+    """
+    # Consecutive calendar weeks are consecutive week numbers
+    return _longest_run([_week_idx(c_ord) for c_ord in day_ords])
+
+
+def _current_daily(day_ords, end, today_ord):
+    """
+    Calculates the current streak of a daily habit.
+
+    Args:
+        day_ords (list[int]): The day ordinals of the completions in ascending order.
+        end (int): The number of completions up to today; later ones are ignored.
+        today_ord (int): The ordinal of the day up to which the streak should be calculated.
+
+    Returns:
+        int: The current streak.
+    """
+    # If the most recent completion is not today, the current streak is 0
+    if day_ords[end - 1] != today_ord:
+        return 0
+
+    current_streak = 1  # Reaches here ONLY if the most recent completion is today
+    last_ord = today_ord
+
+    # Walk backwards from the most recent completion; every completion either
+    # repeats the last counted day, extends the streak, or ends it
+    for i in range(end - 2, -1, -1):
+        c_ord = day_ords[i]
+        if c_ord == last_ord:
+            continue  # Another completion on a day already counted
+        if c_ord != last_ord - 1:
+            break  # Gap found
+        current_streak += 1
+        last_ord = c_ord
+    return current_streak
+
+
+def _current_weekly(day_ords, end, today_ord):
+    """
+    Calculates the current streak of a weekly habit.
+
+    Args:
+        day_ords (list[int]): The day ordinals of the completions in ascending order.
+        end (int): The number of completions up to today; later ones are ignored.
+        today_ord (int): The ordinal of the day up to which the streak should be calculated.
+
+    Returns:
+        int: The current streak.
+    """
+    current_week = _week_idx(today_ord)
+    # If the habit was not completed this week, the current streak is 0
+    if _week_idx(day_ords[end - 1]) != current_week:
+        return 0
+
+    # If the habit was completed this week
+    current_streak = 1
+    last_week = current_week
+
+    # Walk backwards from the most recent completion; every completion either
+    # repeats the last counted week, extends the streak, or ends it
+    for i in range(end - 2, -1, -1):
+        c_week = _week_idx(day_ords[i])
+        if c_week == last_week:
+            continue  # Another completion in a week already counted
+        if c_week != last_week - 1:
+            break  # Gap found
+        current_streak += 1
+        last_week = c_week
+    return current_streak
+
+
+def _missed_daily(window_ords, start_ord, end_ord):
+    """
+    Counts the days of a window on which a daily habit was not completed.
+
+    Args:
+        window_ords (list[int]): The day ordinals of the completions within the window.
+        start_ord (int): The ordinal of the first day of the window.
+        end_ord (int): The ordinal of the last day of the window.
+
+    Returns:
+        int: The number of missed days.
+    """
+    # All completions are within the window, so every distinct completion day
+    # is a day that was not missed; counting them needs no Python-level loop.
+    return (end_ord - start_ord + 1) - len(set(window_ords))
+
+
+def _missed_weekly(window_ords, start_ord, end_ord):
+    """
+    Counts the calendar weeks overlapping a window in which a weekly habit
+    was not completed.
+
+    Args:
+        window_ords (list[int]): The day ordinals of the completions within the window.
+        start_ord (int): The ordinal of the first day of the window.
+        end_ord (int): The ordinal of the last day of the window.
+
+    Returns:
+        int: The number of missed weeks.
+    """
+    # Mark the calendar weeks overlapping the window that contain
+    # a completion within the strictly defined period.
+    first_week = _week_idx(start_ord)
+    completed_weeks = bytearray(_week_idx(end_ord) - first_week + 1)
+    for c_ord in window_ords:
+        completed_weeks[_week_idx(c_ord) - first_week] = 1
+    return completed_weeks.count(0)
+
+
+# The periodicity of a habit is fixed, so it is dispatched once per habit
+# to the matching function instead of being re-tested inside the loops.
+_LONGEST_STREAK = {DAILY: _longest_daily, WEEKLY: _longest_weekly}
+_CURRENT_STREAK = {DAILY: _current_daily, WEEKLY: _current_weekly}
+_MISSED_PERIODS = {DAILY: _missed_daily, WEEKLY: _missed_weekly}
+# Maps a day ordinal to the number of its period (None: the ordinal itself)
+_PERIOD_NUMBER = {DAILY: None, WEEKLY: _week_idx}
+
+
+def period_number(periodicity, day_ord):
+    """
+    Numbers the period (day or calendar week) a day falls into.
+    Consecutive periods have consecutive numbers, also across year changes.
+
+    Args:
+        periodicity (str): The periodicity of the habit.
+        day_ord (int): The day ordinal (see date.toordinal()).
+
+    Returns:
+        int or None: The number of the period, or None for an unknown periodicity.
+    """
+    if periodicity not in _PERIOD_NUMBER:
+        return None
+    number = _PERIOD_NUMBER[periodicity]
+    return day_ord if number is None else number(day_ord)
+
+
+def period_numbers(periodicity, day_ords):
+    """
+    Numbers the periods (see period_number) several days fall into.
+
+    Args:
+        periodicity (str): The periodicity of the habit.
+        day_ords (list[int]): The day ordinals (see date.toordinal()).
+
+    Returns:
+        list[int]: The number of the period of each day, or an empty list for an
+                   unknown periodicity.
+    """
+    if periodicity not in _PERIOD_NUMBER:
+        return []
+    number = _PERIOD_NUMBER[periodicity]
+    return day_ords if number is None else [number(d) for d in day_ords]
+
+
+def get_longest_run_streak(habits, now=None):
     """
     Calculates the longest streak for each habit in a list of habits.
 
     Args:
         habits (list[Habit]): A list of Habit objects.
+        now (datetime, optional): The current time; later completions are ignored.
+                                  Defaults to now.
 
     Returns:
         list[tuple[Habit, int]]: A list of tuples, containing the habit and its
                                   longest streak.
     """
     results = []
-    now = datetime.now()  # Current time
+    now = now if now else datetime.now()  # Current time
     for habit in habits:
-        # Consider only completions up to the current time
-        relevant_completions = [c for c in habit.completions if c <= now]
-        if not relevant_completions:
+        longest = _LONGEST_STREAK.get(habit.periodicity)
+        # Consider only completions up to the current time; the completions
+        # of a habit are kept sorted, so no sorting is needed here
+        count = bisect_right(habit.completions, now)
+        if longest is None or not count:
             results.append((habit, 0))
             continue
-
-        longest_streak = 0
-        # Ensure the list is still sorted after filtering
-        sorted_completions = sorted(relevant_completions)
-
-        for i in range(len(sorted_completions)):
-            current_streak = 1  # Starts the streak with the current completion
-            for j in range(i + 1, len(sorted_completions)):
-                # Check if the next completion follows the periodicity pattern
-                if habit.periodicity == "daily":
-                    expected_next_date = sorted_completions[j - 1].date() + timedelta(days=1)
-                    if sorted_completions[j].date() == expected_next_date:
-                        current_streak += 1
-                    else:
-                        break  # Streak broken
-                elif habit.periodicity == "weekly":
-                    # Check if the next completion is in the directly following week
-                    # Assumption: Weeks start on Monday (weekday 0)
-                    current_iso_week = sorted_completions[j - 1].isocalendar()
-                    next_iso_week = sorted_completions[j].isocalendar()
-
-                    # Check if the next completion is in the directly following week,
-                    # considering year changes.
-                    if (next_iso_week[0] == current_iso_week[0] and next_iso_week[1] == current_iso_week[1] + 1) or \
-                            (next_iso_week[0] == current_iso_week[0] + 1 and next_iso_week[1] == 1 and current_iso_week[
-                                1] in [52, 53]):  # Handle 52 or 53 weeks in a year
-                        current_streak += 1
-                    else:
-                        break
-            longest_streak = max(longest_streak, current_streak)
-        results.append((habit, longest_streak))
+        results.append((habit, longest(habit.completion_ordinals[:count])))
     return results
 
 
@@ -65,68 +262,34 @@ def get_current_streak(habit, today):
     Returns:
         int: The current streak.
     """
-    if not habit.completions:
+    current = _CURRENT_STREAK.get(habit.periodicity)
+    if current is None or not habit.completions:
         return 0
 
     # Filter out future completions for the current streak calculation
-    relevant_completions = [c for c in habit.completions if c.date() <= today.date()]
-    if not relevant_completions:
+    today_ord = today.toordinal()
+    count = bisect_right(habit.completion_ordinals, today_ord)
+    if not count:
         return 0  # No relevant completions
 
-    # Sort completions in descending order by date to check the current streak
-    sorted_relevant_completions = sorted(relevant_completions, reverse=True)
-
-    if habit.periodicity == "daily":
-        # If the most recent completion is not today, the current streak is 0
-        if sorted_relevant_completions[0].date() != today.date():
-            return 0
-
-        current_streak = 1  # Reaches here ONLY if sorted_relevant_completions[0].date() == today.date()
-        expected_date = today.date() - timedelta(days=1)
-
-        for i in range(1, len(sorted_relevant_completions)):
-            if sorted_relevant_completions[i].date() == expected_date:
-                current_streak += 1
-                expected_date -= timedelta(days=1)
-            elif sorted_relevant_completions[i].date() < expected_date:
-                break  # Gap found
-        return current_streak
-
-    elif habit.periodicity == "weekly":
-        current_year, current_week_num, _ = today.isocalendar()
-
-        # Check if the habit was completed in the current calendar week
-        completed_this_week = False
-        for c in sorted_relevant_completions:
-            c_year, c_week_num, _ = c.isocalendar()
-            if c_year == current_year and c_week_num == current_week_num:
-                completed_this_week = True
-                break
-
-        # If the habit was not completed this week, the current streak is 0
-        if not completed_this_week:
-            return 0
-
-        # If the habit was completed this week
-        current_streak = 1
-        expected_week_year = current_year
-        expected_week_num = current_week_num - 1
-        if expected_week_num < 1:  # Year change
-            expected_week_num = 52  # assuming 52 weeks in a year for simplicity
-            expected_week_year -= 1
-
-        for c in sorted_relevant_completions:
-            c_year, c_week_num, _ = c.isocalendar()
-            if c_year == expected_week_year and c_week_num == expected_week_num:
-                current_streak += 1
-                expected_week_num -= 1
-                if expected_week_num < 1:  # Year change
-                    expected_week_num = 52
-                    expected_week_year -= 1
-            elif c_year < expected_week_year or (c_year == expected_week_year and c_week_num < expected_week_num):
-                break  # Gap found
-        return current_streak
-    return 0
+    # The completions are sorted, so the streak is checked by walking them
+    # backwards from the most recent one instead of sorting them in reverse
+    return current(habit.completion_ordinals, count, today_ord)
+
+
+def get_streaks(habit, now):
+    """
+    Calculates the current and the longest streak for a single habit.
+
+    Args:
+        habit (Habit): The Habit object.
+        now (datetime): The current time up to which the streaks should be calculated.
+
+    Returns:
+        tuple[int, int]: The current streak (see get_current_streak) and the
+                         longest streak (see get_longest_run_streak).
+    """
+    return get_current_streak(habit, now), get_longest_run_streak([habit], now)[0][1]
 
 
 def get_struggling_habits(habits, period_days):
@@ -146,47 +309,18 @@ def get_struggling_habits(habits, period_days):
     # The period includes exactly 'period_days' days up to and including today.
     # If period_days=30, the period starts 29 days ago and ends today (total 30 days).
     start_date_period = end_date - timedelta(days=period_days - 1) if period_days > 0 else end_date
+    start_ord = start_date_period.toordinal()
+    end_ord = end_date.toordinal()
 
     for habit in habits:
-        missed_count = 0
-        # Relevant completions only within the strictly defined period
-        completions_in_period = [c for c in habit.completions if
-                                 start_date_period.date() <= c.date() <= end_date.date()]
-
-        if habit.periodicity == "daily":
-            current_date_iter = start_date_period.date()
-            while current_date_iter <= end_date.date():
-                if not any(c.date() == current_date_iter for c in completions_in_period):
-                    missed_count += 1
-                current_date_iter += timedelta(days=1)
-        elif habit.periodicity == "weekly":
-            # Determine the start week of the checking period (Monday)
-            first_week_in_period_start = start_date_period - timedelta(days=start_date_period.weekday())
-
-            current_week_iter_start = first_week_in_period_start
-
-            # Loop through each week that overlaps with the 'period_days' window
-            while current_week_iter_start <= end_date:
-                current_week_iter_end = current_week_iter_start + timedelta(days=6)
-
-                # Check if this calendar week is even relevant
-                # A week is relevant if at least one day of the week falls within the 'period_days' window
-                # i.e., the start of the week (Monday) must be BEFORE the end of the period
-                # AND the end of the week (Sunday) must be AFTER the beginning of the period.
-                if current_week_iter_start > end_date or current_week_iter_end < start_date_period:
-                    current_week_iter_start += timedelta(weeks=1)
-                    continue
-
-                week_completed = False
-                for c in completions_in_period:
-                    if current_week_iter_start.date() <= c.date() <= current_week_iter_end.date():
-                        week_completed = True
-                        break
-
-                if not week_completed:
-                    missed_count += 1
-
-                current_week_iter_start += timedelta(weeks=1)
+        missed = _MISSED_PERIODS.get(habit.periodicity)
+        if missed is None:
+            continue
+        # The completions are sorted, so the relevant ones are found by binary
+        # search instead of scanning the whole history
+        ords = habit.completion_ordinals
+        window_ords = ords[bisect_left(ords, start_ord):bisect_right(ords, end_ord)]
+        missed_count = missed(window_ords, start_ord, end_ord)
 
         if missed_count > 0:  # Only add habits that were actually missed
             struggling.append((habit, missed_count))
@@ -196,4 +330,3 @@ def get_struggling_habits(habits, period_days):
 
     # Return only the names of the habits
     return [h.name for h, count in struggling]
-
@@ -1,6 +1,39 @@
 import json
 import os
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library works as well
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # ujson is an optional fallback where orjson is unavailable
+    ujson = None
+
+
+def _dumps(data):
+    """
+    Serializes data to compact UTF-8 encoded JSON, using orjson or ujson if available.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    if ujson is not None:
+        return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(payload):
+    """
+    Parses UTF-8 encoded JSON, using orjson or ujson if available.
+    """
+    if orjson is not None:
+        return orjson.loads(payload)
+    if ujson is not None:
+        return ujson.loads(payload)
+    return json.loads(payload)
+
+
 class DB:
     """
     Manages loading and saving data to a JSON file.
@@ -13,6 +46,8 @@ class DB:
             file_path (str): The path to the JSON file.
         """
         self.file_path = file_path
+        self._cache = None # Data parsed by the last load_data call
+        self._cache_stat = None # (inode, mtime, size) of the file when it was parsed
         self._ensure_file_exists()
 
     def _ensure_file_exists(self):
@@ -20,32 +55,80 @@ class DB:
         Ensures that the JSON file exists. If not, it is created.
         """
         if not os.path.exists(self.file_path):
-            with open(self.file_path, 'w') as f:
-                json.dump([], f) # Creates an empty JSON list
+            with open(self.file_path, 'wb') as f:
+                f.write(_dumps([])) # Creates an empty JSON list
 
     def load_data(self):
         """
         Loads data from the JSON file.
+        The file is only parsed again if it has changed on disk since the last
+        call, so the returned data is shared and must not be mutated.
 
         Returns:
             list: A list of the loaded data (habit dictionaries).
         """
         try:
-            with open(self.file_path, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
+            with open(self.file_path, 'rb') as f:
+                # Stat the opened file itself, so the cache key always describes
+                # the bytes that are read even if the file is replaced meanwhile
+                st = os.fstat(f.fileno())
+                cache_stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+                if cache_stat == self._cache_stat:
+                    return self._cache
+                data = _loads(f.read())
+        except ValueError: # The decode errors of json, orjson and ujson are all ValueErrors
             print(f"Warning: The file '{self.file_path}' is empty or corrupted. Starting with empty data.")
             return []
         except FileNotFoundError:
             self._ensure_file_exists() # Should not happen, but for safety
             return []
+        self._cache = data
+        self._cache_stat = cache_stat
+        return data
 
     def save_data(self, data):
         """
         Saves data to JSON file.
+        The file is replaced atomically.
+
+        Args:
+            data (list): The list of data (habit dictionaries) to save.
+        """
+        payload = _dumps(data)
+        # Write to a temporary file first, so a crash mid-write cannot corrupt the data
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, self.file_path)
+        self._cache_stat = None # The cached data is outdated, even if the file looks the same
+
+
+class InMemoryDB:
+    """
+    Keeps the data in memory instead of a JSON file, e.g. for tests.
+    Offers the same interface as DB; the data is kept serialized, so it goes
+    through the same JSON round trip as with a file.
+    """
+    def __init__(self):
+        """
+        Initializes the in-memory DB with no data.
+        """
+        self._blob = _dumps([])
+
+    def load_data(self):
+        """
+        Loads the data saved last.
+
+        Returns:
+            list: A list of the loaded data (habit dictionaries).
+        """
+        return _loads(self._blob)
+
+    def save_data(self, data):
+        """
+        Saves the data in memory.
 
         Args:
             data (list): The list of data (habit dictionaries) to save.
         """
-        with open(self.file_path, 'w') as f:
-            json.dump(data, f, indent=4)
+        self._blob = _dumps(data)
@@ -1,11 +1,27 @@
 import json
+import sys
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import analytics
+from analytics import DAILY, WEEKLY
+
+
+# The error raised when the period of a completion has already been completed
+_ALREADY_COMPLETED = {
+    DAILY: "Habit has already been completed today.",
+    WEEKLY: "Habit has already been completed this week.",
+}
 
 class Habit:
     """
     Represents a single habit with its properties and methods.
     """
+    # No per-instance __dict__; 'completions' is a property over _completions
+    __slots__ = ("name", "description", "_periodicity", "creation_date", "last_completed",
+                 "_completions_version", "_streaks_cache", "_completions_raw",
+                 "_completions", "_completions_view", "_completion_ordinals", "_completion_keys")
+
     def __init__(self, name, description, periodicity, creation_date=None, last_completed=None, completions=None):
         """
         Initializes a Habit.
@@ -24,10 +40,62 @@ class Habit:
         """
         self.name = name
         self.description = description
-        self.periodicity = periodicity
+        # Interned, so comparing and hashing it in the hot paths is an identity check
+        self._periodicity = sys.intern(periodicity)
         self.creation_date = creation_date if creation_date else datetime.now()
         self.last_completed = last_completed
-        self.completions = sorted(completions) if completions else []
+        self._completions_version = 0 # Bumped whenever the completions change
+        self._streaks_cache = None # ((version, day, completions so far), (current, longest))
+        self._completions_raw = None # ISO strings of completions not parsed yet
+        self.completions = completions if completions else []
+
+    @property
+    def periodicity(self):
+        """
+        str: The periodicity of the habit. It is read-only, as the completed
+        periods (and the index of a HabitTracker) depend on it.
+        """
+        return self._periodicity
+
+    @property
+    def completions(self):
+        """
+        tuple[datetime]: The timestamps when the habit was completed, in ascending order.
+        Read-only, as the day ordinals and completed periods are kept in step
+        with it; assigning a list stores a sorted copy of it.
+        """
+        if self._completions_raw is not None:
+            self._parse_completions()
+        if self._completions_view is None:
+            self._completions_view = tuple(self._completions)
+        return self._completions_view
+
+    @completions.setter
+    def completions(self, completions):
+        self._completions_raw = None
+        self._completions = sorted(completions)
+        self._completions_view = None
+        self._completion_ordinals = [c.toordinal() for c in self._completions]
+        # The days or weeks already completed
+        self._completion_keys = set(analytics.period_numbers(self._periodicity, self._completion_ordinals))
+        self._completions_version += 1
+
+    def _parse_completions(self):
+        """
+        Parses the completions loaded as ISO strings, on first use.
+        """
+        raw = self._completions_raw
+        self.completions = [datetime.fromisoformat(c) for c in raw]
+
+    @property
+    def completion_ordinals(self):
+        """
+        list[int]: The day ordinals (see date.toordinal()) of the completions,
+        in the same order as completions.
+        """
+        if self._completions_raw is not None:
+            self._parse_completions()
+        return self._completion_ordinals
 
     def mark_completed(self, date=None):
         """
@@ -39,44 +107,106 @@ class Habit:
                                        Defaults to None (current time).
         """
         completion_date = date if date else datetime.now()
-        # Prevent duplicate entries for the same day/week
-        if self.periodicity == "daily":
-            if self.completions and self.completions[-1].date() == completion_date.date():
-                raise ValueError("Habit has already been completed today.")
-        elif self.periodicity == "weekly":
-            # Check if the habit has already been completed in the current calendar week
-            # Calendar week starts on Monday (isocalendar().week)
-            if self.completions and self.completions[-1].isocalendar().week == completion_date.isocalendar().week \
-                                and self.completions[-1].year == completion_date.year:
-                raise ValueError("Habit has already been completed this week.")
-        self.completions.append(completion_date)
-        self.completions.sort() # Ensure the list is always sorted
+        if self._completions_raw is not None:
+            self._parse_completions()
+        completion_ord = completion_date.toordinal()
+        # Prevent duplicate entries for the same day/week. Calendar weeks start
+        # on Monday; the week numbers run on across year changes, so no year
+        # needs to be compared
+        completion_key = analytics.period_number(self._periodicity, completion_ord)
+        if completion_key in self._completion_keys:
+            raise ValueError(_ALREADY_COMPLETED[self._periodicity])
+        # Keep the list sorted (and the day ordinals in step). Completions are
+        # almost always the latest one, so appending is tried first.
+        if not self._completions or self._completions[-1] <= completion_date:
+            self._completions.append(completion_date)
+            self._completion_ordinals.append(completion_ord)
+        else:
+            idx = bisect_right(self._completions, completion_date)
+            self._completions.insert(idx, completion_date)
+            self._completion_ordinals.insert(idx, completion_ord)
+        self._completions_view = None
+        if completion_key is not None:
+            self._completion_keys.add(completion_key)
+        self._completions_version += 1
         self.last_completed = completion_date
 
-    def get_current_streak(self):
+    def mark_completed_many(self, dates):
         """
-        Calculates the current streak (number of consecutive completions).
+        Marks the habit as completed for several dates at once.
+        Either all dates are added or, if one of them is a duplicate, none.
+
+        Args:
+            dates (iterable[datetime]): The dates the habit was completed.
+
+        Raises:
+            ValueError: If the habit has already been completed on one of the
+                        days/in one of the weeks, or two dates fall on the same one.
 
         Returns:
-            int: The current streak.
+            bool: True if any completion was added, False if dates is empty.
+        """
+        dates = list(dates)
+        if not dates:
+            return False
+        if self._completions_raw is not None:
+            self._parse_completions()
+        # Check all dates for duplicates at once before changing anything
+        keys = analytics.period_numbers(self._periodicity, [d.toordinal() for d in dates])
+        new_keys = set(keys)
+        if len(new_keys) != len(keys) or not new_keys.isdisjoint(self._completion_keys):
+            raise ValueError("Habit has already been completed for one of the given dates.")
+        # Merge and sort once; the setter rebuilds the day ordinals and keys
+        self.completions = self._completions + dates
+        self.last_completed = dates[-1]
+        return True
+
+    def get_streaks(self, now=None):
+        """
+        Calculates the current streak and the longest streak together.
+        The result is reused until the completions change, the day changes or
+        a completion that was in the future becomes past.
+
+        Args:
+            now (datetime, optional): The current time, so callers handling several
+                                      habits can share one. Defaults to now.
+
+        Returns:
+            tuple[int, int]: The current streak and the longest streak.
         """
         if not self.completions:
-            return 0
+            return 0, 0
+        now = now if now else datetime.now()
+        # Only completions up to now count for the longest streak, so their number is part of the key
+        key = (self._completions_version, now.toordinal(), bisect_right(self._completions, now))
+        if self._streaks_cache is None or self._streaks_cache[0] != key:
+            self._streaks_cache = (key, analytics.get_streaks(self, now))
+        return self._streaks_cache[1]
 
-        # Calculates the current streak based on periodicity
-        return analytics.get_current_streak(self, datetime.now())
+    def get_current_streak(self, now=None):
+        """
+        Calculates the current streak (number of consecutive completions).
 
-    def get_longest_streak(self):
+        Args:
+            now (datetime, optional): The current time. Defaults to now.
+
+        Returns:
+            int: The current streak.
+        """
+        return self.get_streaks(now)[0]
+
+    def get_longest_streak(self, now=None):
         """
         Calculates the longest streak (number of consecutive completions)
         in the history of the habit.
 
+        Args:
+            now (datetime, optional): The current time. Defaults to now.
+
         Returns:
             int: The longest streak.
         """
-        if not self.completions:
-            return 0
-        return analytics.get_longest_run_streak([self])[0][1] # Pass habit as a list to analytics function
+        return self.get_streaks(now)[1]
 
     def was_broken(self, period_start, period_end):
         """
@@ -89,33 +219,38 @@ class Habit:
         Returns:
             bool: True if the habit was broken, False otherwise.
         """
-        # Get all completion dates within the specified period
-        completions_in_period = [
-            c for c in self.completions if period_start <= c <= period_end
-        ]
+        if self._completions_raw is not None:
+            self._parse_completions()
+        # Get the day ordinals of all completions within the specified period;
+        # the completions are sorted, so the period is found by binary search
+        lo = bisect_left(self._completions, period_start)
+        hi = bisect_right(self._completions, period_end)
+        ords_in_period = self._completion_ordinals[lo:hi]
 
-        if self.periodicity == "daily":
+        if self.periodicity == DAILY:
             # Check each day in the period
-            current_date = period_start
-            while current_date <= period_end:
-                if not any(c.date() == current_date.date() for c in completions_in_period):
+            completed_days = set(ords_in_period)
+            # Number of days from period_start, in steps of whole days, up to period_end
+            time_span = period_end - period_start
+            day_count = time_span // timedelta(days=1) + 1 if time_span >= timedelta(0) else 0
+            start_ord = period_start.toordinal()
+            for day_ord in range(start_ord, start_ord + day_count):
+                if day_ord not in completed_days:
                     # If no completion was found on a day in the period
                     return True
-                current_date += timedelta(days=1)
             return False
-        elif self.periodicity == "weekly":
+        elif self.periodicity == WEEKLY:
             # Check each week in the period
             # Find the first week
             first_week_start = period_start - timedelta(days=period_start.weekday()) # Monday of the week
-            current_week_start = first_week_start
-            while current_week_start <= period_end:
-                # Find the end of the current week
-                current_week_end = current_week_start + timedelta(days=6)
-                # Check if there was a completion in this week
-                if not any(c for c in completions_in_period if current_week_start.date() <= c.date() <= current_week_end.date()):
-                    return True # Habit broken this week
-                current_week_start += timedelta(weeks=1)
-            return False
+            first_week_ord = first_week_start.toordinal()
+            # Number of weeks whose Monday falls within the period
+            time_span = period_end - first_week_start
+            week_count = time_span // timedelta(weeks=1) + 1 if time_span >= timedelta(0) else 0
+            # Bucket the completions into the weeks of the period; the habit is
+            # broken unless every one of them got at least one completion
+            completed_weeks = {(c_ord - first_week_ord) // 7 for c_ord in ords_in_period}
+            return len(completed_weeks.intersection(range(week_count))) < week_count
         return True # Invalid periodicity
 
     def to_dict(self):
@@ -128,25 +263,29 @@ class Habit:
             "periodicity": self.periodicity,
             "creation_date": self.creation_date.isoformat(),
             "last_completed": self.last_completed.isoformat() if self.last_completed else None,
-            "completions": [c.isoformat() for c in self.completions]
+            # Completions that were never parsed are written back unchanged
+            "completions": (list(self._completions_raw) if self._completions_raw is not None
+                            else [c.isoformat() for c in self._completions])
         }
 
     @classmethod
     def from_dict(cls, data):
         """
         Creates a habit object from a dictionary.
+        The completions are only parsed when they are first used.
         """
         creation_date = datetime.fromisoformat(data["creation_date"])
         last_completed = datetime.fromisoformat(data["last_completed"]) if data["last_completed"] else None
-        completions = [datetime.fromisoformat(c) for c in data["completions"]]
-        return cls(
+        habit = cls(
             data["name"],
             data["description"],
             data["periodicity"],
             creation_date,
-            last_completed,
-            completions
+            last_completed
         )
+        if data["completions"]:
+            habit._completions_raw = data["completions"]
+        return habit
 
 class HabitTracker:
     """
@@ -161,6 +300,54 @@ class HabitTracker:
         """
         self.habits = []
         self.db_manager = db_manager
+        self._batch_depth = 0 # Number of open batched() blocks
+        self._dirty = False # Whether changes are waiting to be saved
+
+    @property
+    def habits(self):
+        """
+        list[Habit]: The habits managed by the tracker.
+        Assigning a new list also rebuilds the lookup indexes.
+        """
+        return self._habits
+
+    @habits.setter
+    def habits(self, habits):
+        self._habits = habits
+        self._dirty = True # A new list of habits has not been saved yet
+        self._by_name = {}
+        self._by_period = {}
+        for habit in habits:
+            self._by_name.setdefault(habit.name, habit)
+            self._by_period.setdefault(habit.periodicity, []).append(habit)
+        # A hand-edited file may hold several habits with the same name
+        self._has_duplicate_names = len(self._by_name) < len(habits)
+
+    @contextmanager
+    def batched(self):
+        """
+        Groups several changes into a single save.
+        Within the block, adding, deleting and completing habits does not save
+        to the file; pending changes are saved once the outermost block exits.
+
+        Yields:
+            HabitTracker: The tracker itself.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self.save_to_file()
+
+    def _save_changes(self):
+        """
+        Saves the habits after a change, or defers the save while batching.
+        """
+        self._dirty = True
+        if not self._batch_depth:
+            self.save_to_file()
 
     def add_habit(self, name, description, periodicity):
         """
@@ -171,11 +358,13 @@ class HabitTracker:
             description (str): The description of the habit.
             periodicity (str): The periodicity of the habit ('daily' or 'weekly').
         """
-        if self.get_habit_by_name(name):
+        if name in self._by_name:
             raise ValueError(f"Habit with the name '{name}' already exists.")
         habit = Habit(name, description, periodicity)
-        self.habits.append(habit)
-        self.save_to_file()
+        self._habits.append(habit)
+        self._by_name[name] = habit
+        self._by_period.setdefault(periodicity, []).append(habit)
+        self._save_changes()
 
     def delete_habit(self, name):
         """
@@ -187,12 +376,19 @@ class HabitTracker:
         Returns:
             bool: True if the habit was deleted, False otherwise.
         """
-        initial_len = len(self.habits)
-        self.habits = [h for h in self.habits if h.name != name]
-        if len(self.habits) < initial_len:
-            self.save_to_file()
-            return True
-        return False
+        habit = self._by_name.get(name)
+        if habit is None:
+            return False
+        if self._has_duplicate_names:
+            # All habits with the name are deleted, not only the indexed one
+            self.habits = [h for h in self._habits if h.name != name]
+        else:
+            # Remove the habit in place instead of rebuilding the lists
+            del self._by_name[name]
+            self._habits.remove(habit)
+            self._by_period[habit.periodicity].remove(habit)
+        self._save_changes()
+        return True
 
     def complete_habit(self, name, date=None):
         """
@@ -208,7 +404,26 @@ class HabitTracker:
         habit = self.get_habit_by_name(name)
         if habit:
             habit.mark_completed(date)
-            self.save_to_file()
+            self._save_changes()
+        else:
+            raise ValueError(f"Habit '{name}' not found.")
+
+    def complete_habits_bulk(self, name, dates):
+        """
+        Marks a habit as completed for several dates with a single save.
+
+        Args:
+            name (str): The name of the habit.
+            dates (iterable[datetime]): The dates of completion.
+
+        Raises:
+            ValueError: If the habit is not found or has already been completed
+                        for one of the dates (then none of them is added).
+        """
+        habit = self.get_habit_by_name(name)
+        if habit:
+            if habit.mark_completed_many(dates):
+                self._save_changes()
         else:
             raise ValueError(f"Habit '{name}' not found.")
 
@@ -222,10 +437,7 @@ class HabitTracker:
         Returns:
             Habit or None: The Habit object if found, None otherwise.
         """
-        for habit in self.habits:
-            if habit.name == name:
-                return habit
-        return None
+        return self._by_name.get(name)
 
     def get_all_habits(self):
         """
@@ -233,6 +445,30 @@ class HabitTracker:
         """
         return self.habits
 
+    def get_display_snapshot(self):
+        """
+        Returns the values shown for each habit in an overview, computed in one
+        pass over the habits.
+
+        Returns:
+            list[dict]: One dictionary per habit with the keys 'name', 'description',
+                        'periodicity', 'current_streak', 'longest_streak' and
+                        'last_completion' (datetime or None).
+        """
+        now = datetime.now() # Shared by all habits
+        snapshot = []
+        for habit in self.habits:
+            current_streak, longest_streak = habit.get_streaks(now)
+            snapshot.append({
+                "name": habit.name,
+                "description": habit.description,
+                "periodicity": habit.periodicity,
+                "current_streak": current_streak,
+                "longest_streak": longest_streak,
+                "last_completion": habit.completions[-1] if habit.completions else None,
+            })
+        return snapshot
+
     def get_habits_by_period(self, periodicity):
         """
         Returns a list of habits with a specific periodicity.
@@ -243,7 +479,7 @@ class HabitTracker:
         Returns:
             list[Habit]: A list of Habit objects.
         """
-        return [h for h in self.habits if h.periodicity == periodicity]
+        return list(self._by_period.get(periodicity, ()))
 
     def get_longest_streak_for_habit(self, habit_name):
         """
@@ -281,10 +517,12 @@ class HabitTracker:
         """
         data = [habit.to_dict() for habit in self.habits]
         self.db_manager.save_data(data)
+        self._dirty = False
 
     def load_from_file(self):
         """
         Loads habits from the configured JSON file.
         """
         data = self.db_manager.load_data()
-        self.habits = [Habit.from_dict(d) for d in data]
\ No newline at end of file
+        self.habits = [Habit.from_dict(d) for d in data]
+        self._dirty = False # The habits match the file
\ No newline at end of file
@@ -1,70 +1,173 @@
-import os
-from habit_tracker import HabitTracker
-from db import DB
-from datetime import datetime
+import sys
+import threading
+
+# Valid periodicities
+PERIODICITIES = frozenset(("daily", "weekly"))
+
+class BackgroundLoader(threading.Thread):
+    """
+    Loads the habits of a HabitTracker in a background thread.
+    An exception raised while loading is kept, so the CLI can raise it again
+    instead of continuing (and later saving) with no habits.
+    """
+    def __init__(self, habit_tracker):
+        """
+        Initializes the loader thread.
+
+        Args:
+            habit_tracker (HabitTracker): The HabitTracker whose habits are loaded.
+        """
+        super().__init__(daemon=True)
+        self.habit_tracker = habit_tracker
+        self.error = None # The exception raised while loading, if any
+
+    def run(self):
+        """
+        Loads the habits from the file, keeping any exception raised.
+        """
+        try:
+            self.habit_tracker.load_from_file()
+        except Exception as e:
+            self.error = e
 
 class CLI:
     """
     Class for the Command Line Interface (CLI) of the Habit Tracker.
     Manages interaction with the user and calls HabitTracker functions.
     """
-    def __init__(self, habit_tracker):
+    def __init__(self, habit_tracker, loader=None):
         """
         Initializes the CLI with an instance of HabitTracker.
         Args:
             habit_tracker (HabitTracker): The HabitTracker instance.
+            loader (BackgroundLoader, optional): A thread still loading the habits.
+                                                 It is waited for before the first
+                                                 action that uses them.
         """
         self.habit_tracker = habit_tracker
+        self.loader = loader
+        # Piped input is read line by line without the interactive input() machinery
+        self._interactive = sys.stdin.isatty()
+        # Menu options mapped to their handlers ('6' exits and is handled in run)
+        self._menu = {
+            '1': self.prompt_create_habit,
+            '2': self.prompt_delete_habit,
+            '3': self.prompt_mark_completed,
+            '4': self.prompt_view_current_habits,
+            '5': self.prompt_analysis,
+        }
+        self._analysis_menu = {
+            '1': self._analyze_by_periodicity,
+            '2': self._analyze_longest_streak,
+            '3': self._analyze_struggling_habits,
+        }
+
+    def _wait_for_habits(self):
+        """
+        Waits until the habits have been loaded, if they are loaded in the background.
+
+        Raises:
+            Exception: The exception raised while loading the habits, if any.
+        """
+        if self.loader is not None:
+            self.loader.join()
+            loader, self.loader = self.loader, None
+            if loader.error is not None:
+                raise loader.error
+
+    def _read(self, prompt):
+        """
+        Shows a prompt and reads a line of user input, like input().
+
+        Args:
+            prompt (str): The prompt shown to the user.
+
+        Returns:
+            str: The line entered, without the trailing newline.
+
+        Raises:
+            EOFError: If the input has ended.
+        """
+        if self._interactive:
+            return input(prompt)
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        line = sys.stdin.readline()
+        if not line:
+            raise EOFError
+        return line[:-1] if line.endswith("\n") else line
+
+    def _prompt_periodicity(self, prompt):
+        """
+        Asks the user for a periodicity and validates it.
+
+        Args:
+            prompt (str): The prompt shown to the user.
+
+        Returns:
+            str or None: The periodicity, or None if the input is invalid.
+        """
+        periodicity = self._read(prompt).strip().lower()
+        if periodicity not in PERIODICITIES:
+            print("Invalid periodicity. Please enter 'daily' or 'weekly'.")
+            return None
+        return periodicity
 
     def run(self):
         """
         Starts the main CLI loop and displays the menu.
         """
         print("Welcome to the Habit Tracker – \"MeTime\"")
-        while True:
-            self._display_menu()
-            choice = input("Select an option: ")
-            if choice == '1':
-                self.prompt_create_habit()
-            elif choice == '2':
-                self.prompt_delete_habit()
-            elif choice == '3':
-                self.prompt_mark_completed()
-            elif choice == '4':
-                self.prompt_view_current_habits()
-            elif choice == '5':
-                self.prompt_analysis()
-            elif choice == '6':
-                print("Goodbye!")
-                break
-            else:
-                print("Invalid input. Please try again.")
+        # Changes made during the session are saved once, when the loop is left
+        with self.habit_tracker.batched():
+            try:
+                while True:
+                    self._display_menu()
+                    choice = self._read("Select an option: ")
+                    if choice == '6':
+                        break
+                    handler = self._menu.get(choice)
+                    if handler is None:
+                        print("Invalid input. Please try again.")
+                        continue
+                    self._wait_for_habits()
+                    handler()
+            except EOFError:
+                print() # The input ended (e.g. a piped script), which exits as well
+            self._wait_for_habits() # Before the final save on exit
+            print("Goodbye!")
 
     def _display_menu(self):
         """
         Displays the main CLI menu.
         """
-        print("\n--- Menu ---")
-        print("1. Create a new habit")
-        print("2. Delete an existing habit")
-        print("3. Mark a habit as completed")
-        print("4. View current habits")
-        print("5. Analyze habit performance")
-        print("6. Exit")
+        # Written as one block instead of one print per line
+        sys.stdout.write(
+            "\n--- Menu ---\n"
+            "1. Create a new habit\n"
+            "2. Delete an existing habit\n"
+            "3. Mark a habit as completed\n"
+            "4. View current habits\n"
+            "5. Analyze habit performance\n"
+            "6. Exit\n"
+        )
 
     def prompt_create_habit(self):
         """
         Prompts the user for information to create a new habit
         and creates it.
         """
-        name = input("Habit Name: ").strip()
+        name = self._read("Habit Name: ").strip()
         if not name:
             print("Habit name cannot be empty.")
             return
-        description = input("Habit Description: ").strip()
-        periodicity = input("Periodicity (daily/weekly): ").strip().lower()
-        if periodicity not in ["daily", "weekly"]:
-            print("Invalid periodicity. Please enter 'daily' or 'weekly'.")
+        # Reject a taken name before asking for the rest
+        if self.habit_tracker.get_habit_by_name(name) is not None:
+            print(f"Error: Habit with the name '{name}' already exists.")
+            return
+        description = self._read("Habit Description: ").strip()
+        periodicity = self._prompt_periodicity("Periodicity (daily/weekly): ")
+        if periodicity is None:
             return
         self.habit_tracker.add_habit(name, description, periodicity)
         print(f"Habit '{name}' successfully created.")
@@ -74,7 +177,7 @@ class CLI:
         Prompts the user for the name of a habit to delete
         and deletes it.
         """
-        name = input("Name of the habit to delete: ").strip()
+        name = self._read("Name of the habit to delete: ").strip()
         if not name:
             print("Habit name cannot be empty.")
             return
@@ -88,10 +191,13 @@ class CLI:
         Prompts the user for the name of a habit to mark as completed
         and marks it as completed.
         """
-        name = input("Name of the habit to mark as completed: ").strip()
+        name = self._read("Name of the habit to mark as completed: ").strip()
         if not name:
             print("Habit name cannot be empty.")
             return
+        if self.habit_tracker.get_habit_by_name(name) is None:
+            print(f"Error: Habit '{name}' not found.")
+            return
         try:
             self.habit_tracker.complete_habit(name)
             print(f"Habit '{name}' marked as completed.")
@@ -102,78 +208,100 @@ class CLI:
         """
         Displays all current habits of the user.
         """
-        habits = self.habit_tracker.get_all_habits()
-        if not habits:
+        snapshot = self.habit_tracker.get_display_snapshot()
+        if not snapshot:
             print("No habits found.")
             return
-        print("\n--- Current Habits ---")
-        for habit in habits:
-            print(f"Name: {habit.name}")
-            print(f"  Description: {habit.description}")
-            print(f"  Periodicity: {habit.periodicity}")
-            print(f"  Current Streak: {habit.get_current_streak()}")
-            print(f"  Longest Streak: {habit.get_longest_streak()}")
-            if habit.completions:
-                print(f"  Last Completion Time: {habit.completions[-1].strftime('%Y-%m-%d %H:%M:%S')}")
+        lines = ["\n--- Current Habits ---"]
+        for entry in snapshot:
+            lines.append(f"Name: {entry['name']}")
+            lines.append(f"  Description: {entry['description']}")
+            lines.append(f"  Periodicity: {entry['periodicity']}")
+            lines.append(f"  Current Streak: {entry['current_streak']}")
+            lines.append(f"  Longest Streak: {entry['longest_streak']}")
+            if entry['last_completion']:
+                lines.append(f"  Last Completion Time: {entry['last_completion'].strftime('%Y-%m-%d %H:%M:%S')}")
             else:
-                print("  Not completed yet.")
-            print("-" * 20)
+                lines.append("  Not completed yet.")
+            lines.append("-" * 20)
+        # Written at once instead of one print per line
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def prompt_analysis(self):
         """
         Offers various analysis options for habit performance.
         """
-        print("\n--- Habit Analysis ---")
-        print("1. Show habits by periodicity")
-        print("2. Show longest streak of a habit")
-        print("3. Show habits most frequently missed in the last month")
-        analysis_choice = input("Select an analysis option: ")
-
-        if analysis_choice == '1':
-            period = input("Periodicity (daily/weekly): ").strip().lower()
-            if period not in ["daily", "weekly"]:
-                print("Invalid periodicity. Please enter 'daily' or 'weekly'.")
-                return
-            habits_by_period = self.habit_tracker.get_habits_by_period(period)
-            if habits_by_period:
-                print(f"\n--- Habits with Periodicity '{period}' ---")
-                for habit in habits_by_period:
-                    print(f"- {habit.name} (Streak: {habit.get_current_streak()})")
-            else:
-                print(f"No habits with periodicity '{period}' found.")
-        elif analysis_choice == '2':
-            name = input("Name of the habit for the longest streak: ").strip()
-            if not name:
-                print("Habit name cannot be empty.")
-                return
-            habit = self.habit_tracker.get_habit_by_name(name)
-            if habit:
-                longest_streak = habit.get_longest_streak()
-                print(f"The longest streak for '{name}' is: {longest_streak} days.")
-            else:
-                print(f"Habit '{name}' not found.")
-        elif analysis_choice == '3':
-            struggling_habits = self.habit_tracker.get_struggling_habits()
-            if struggling_habits:
-                print("\n--- Habits Most Frequently Missed in the Last Month ---")
-                for habit_name in struggling_habits:
-                    print(f"- {habit_name}")
-            else:
-                print("No habits were missed in the last month or no data available.")
-        else:
+        sys.stdout.write(
+            "\n--- Habit Analysis ---\n"
+            "1. Show habits by periodicity\n"
+            "2. Show longest streak of a habit\n"
+            "3. Show habits most frequently missed in the last month\n"
+        )
+        analysis_choice = self._read("Select an analysis option: ")
+        handler = self._analysis_menu.get(analysis_choice)
+        if handler is None:
             print("Invalid selection for analysis option.")
+            return
+        handler()
+
+    def _analyze_by_periodicity(self):
+        """
+        Shows the habits with a periodicity entered by the user.
+        """
+        period = self._prompt_periodicity("Periodicity (daily/weekly): ")
+        if period is None:
+            return
+        habits_by_period = self.habit_tracker.get_habits_by_period(period)
+        if habits_by_period:
+            lines = [f"\n--- Habits with Periodicity '{period}' ---"]
+            lines.extend(f"- {habit.name} (Streak: {habit.get_current_streak()})" for habit in habits_by_period)
+            sys.stdout.write("\n".join(lines) + "\n")
+        else:
+            print(f"No habits with periodicity '{period}' found.")
+
+    def _analyze_longest_streak(self):
+        """
+        Shows the longest streak of a habit entered by the user.
+        """
+        name = self._read("Name of the habit for the longest streak: ").strip()
+        if not name:
+            print("Habit name cannot be empty.")
+            return
+        habit = self.habit_tracker.get_habit_by_name(name)
+        if habit:
+            longest_streak = habit.get_longest_streak()
+            print(f"The longest streak for '{name}' is: {longest_streak} days.")
+        else:
+            print(f"Habit '{name}' not found.")
+
+    def _analyze_struggling_habits(self):
+        """
+        Shows the habits most frequently missed in the last month.
+        """
+        struggling_habits = self.habit_tracker.get_struggling_habits()
+        if struggling_habits:
+            lines = ["\n--- Habits Most Frequently Missed in the Last Month ---"]
+            lines.extend(f"- {habit_name}" for habit_name in struggling_habits)
+            sys.stdout.write("\n".join(lines) + "\n")
+        else:
+            print("No habits were missed in the last month or no data available.")
 
 
 if __name__ == "__main__":
+    # The data layer is only imported when the CLI is actually started
+    from habit_tracker import HabitTracker
+    from db import DB
+
     # Path to the JSON file where habits are stored
     DATA_FILE = "habits.json"
     db_manager = DB(DATA_FILE)
     habit_tracker_instance = HabitTracker(db_manager)
 
-    # Load existing data on startup
-    habit_tracker_instance.load_from_file()
+    # Load existing data on startup, in the background while the menu is shown
+    loader = BackgroundLoader(habit_tracker_instance)
+    loader.start()
 
-    cli = CLI(habit_tracker_instance)
+    cli = CLI(habit_tracker_instance, loader)
     cli.run()
 
 
@@ -1,9 +1,13 @@
 import unittest
+import io
 import os
+import tempfile
+from unittest import mock
 from datetime import datetime, timedelta
 from habit_tracker import Habit, HabitTracker
-from db import DB
+from db import DB, InMemoryDB
 import analytics
+from main import CLI, BackgroundLoader
 
 
 class TestHabitTracker(unittest.TestCase):
@@ -14,22 +18,21 @@ class TestHabitTracker(unittest.TestCase):
     def setUp(self):
         """
         Sets up test environment for each test.
-        Creates a temporary database file.
+        The habits are kept in memory; tests of the persistence use _use_file_db.
         """
-        self.test_db_file = "test_habits.json"
-        # Ensure the test file is empty before each test
-        if os.path.exists(self.test_db_file):
-            os.remove(self.test_db_file)
-        self.db_manager = DB(self.test_db_file)
+        self.db_manager = InMemoryDB()
         self.tracker = HabitTracker(self.db_manager)
 
-    def tearDown(self):
+    def _use_file_db(self):
         """
-        Cleans up the test environment after each test.
-        Deletes the temporary database file.
+        Switches the test to a tracker saving to a database file in a temporary
+        directory, which is deleted after the test.
         """
-        if os.path.exists(self.test_db_file):
-            os.remove(self.test_db_file)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.test_db_file = os.path.join(tmp_dir.name, "test_habits.json")
+        self.db_manager = DB(self.test_db_file)
+        self.tracker = HabitTracker(self.db_manager)
 
     def test_add_habit(self):
         """
@@ -59,9 +62,10 @@ class TestHabitTracker(unittest.TestCase):
         """
         self.tracker.add_habit("Read", "Read 30 minutes every day", "daily")
         habit = self.tracker.get_habit_by_name("Read")
+        now = datetime.now()
 
         # Completion for yesterday
-        yesterday = datetime.now() - timedelta(days=1)
+        yesterday = now - timedelta(days=1)
         self.tracker.complete_habit("Read", date=yesterday)
         self.assertEqual(len(habit.completions), 1)
         self.assertEqual(habit.completions[0].date(), yesterday.date())
@@ -69,7 +73,7 @@ class TestHabitTracker(unittest.TestCase):
         self.assertEqual(habit.get_current_streak(), 0)
 
         # Completion for today
-        today = datetime.now()
+        today = now
         self.tracker.complete_habit("Read", date=today)
         self.assertEqual(len(habit.completions), 2)
         self.assertEqual(habit.get_current_streak(), 2)  # Completed yesterday and today
@@ -79,31 +83,95 @@ class TestHabitTracker(unittest.TestCase):
             self.tracker.complete_habit("Read", date=today)
         self.assertEqual(len(habit.completions), 2)  # Number of completions should remain the same
 
+        # Attempt to complete yesterday again, which is not the latest completion
+        with self.assertRaises(ValueError):
+            self.tracker.complete_habit("Read", date=yesterday)
+        self.assertEqual(len(habit.completions), 2)
+
     def test_complete_habit_weekly(self):
         """
         Tests completing a weekly habit.
         """
         self.tracker.add_habit("Weekly Meditation", "Meditate once a week", "weekly")
         habit = self.tracker.get_habit_by_name("Weekly Meditation")
+        now = datetime.now()
 
         # Completion for last week
-        last_week_completion_date = datetime.now() - timedelta(weeks=1, days=3)  # Wednesday last week
+        last_week_completion_date = now - timedelta(weeks=1, days=3)  # Wednesday last week
         self.tracker.complete_habit("Weekly Meditation", date=last_week_completion_date)
         self.assertEqual(len(habit.completions), 1)
         # Expected 0, because the last completion was in the PREVIOUS week and the current week is not completed.
         self.assertEqual(habit.get_current_streak(), 0)
 
         # Completion for this week
-        this_week_completion_date = datetime.now() - timedelta(days=1)  # Yesterday
+        this_week_completion_date = now - timedelta(days=1)  # Yesterday
         self.tracker.complete_habit("Weekly Meditation", date=this_week_completion_date)
         self.assertEqual(len(habit.completions), 2)
         self.assertEqual(habit.get_current_streak(), 2)  # Completed last week and this week
 
         # Attempt to complete again this week
         with self.assertRaises(ValueError):
-            self.tracker.complete_habit("Weekly Meditation", date=datetime.now())
+            self.tracker.complete_habit("Weekly Meditation", date=now)
         self.assertEqual(len(habit.completions), 2)  # Number of completions should remain the same
 
+    def test_complete_habit_weekly_year_change(self):
+        """
+        Tests completing a weekly habit twice in a calendar week spanning New Year.
+        """
+        # Monday, December 30, 2024 and Thursday, January 2, 2025 are in ISO week 1 of 2025
+        habit = Habit("Weekly Meditation", "Meditate once a week", "weekly",
+                      completions=[datetime(2024, 12, 30)])
+        with self.assertRaises(ValueError):
+            habit.mark_completed(datetime(2025, 1, 2))
+        self.assertEqual(len(habit.completions), 1)
+
+    def test_was_broken_daily(self):
+        """
+        Tests checking whether a daily habit was broken in a period.
+        """
+        habit = Habit("Read", "...", "daily",
+                      completions=[datetime(2024, 1, 1, 9), datetime(2024, 1, 2, 9)])
+        self.assertFalse(habit.was_broken(datetime(2024, 1, 1, 8), datetime(2024, 1, 2, 20)))
+        # The days are counted in whole days from the start, so a final day
+        # shorter than that is not checked
+        self.assertFalse(habit.was_broken(datetime(2024, 1, 1, 8), datetime(2024, 1, 3, 7)))
+        self.assertTrue(habit.was_broken(datetime(2024, 1, 1, 8), datetime(2024, 1, 3, 8)))
+        # A completion before the start of the period does not count
+        self.assertTrue(habit.was_broken(datetime(2024, 1, 1, 10), datetime(2024, 1, 2, 20)))
+        # A period ending before it starts has no days to miss
+        self.assertFalse(habit.was_broken(datetime(2024, 1, 2), datetime(2024, 1, 1)))
+
+    def test_was_broken_weekly(self):
+        """
+        Tests checking whether a weekly habit was broken in a period.
+        """
+        # Completed in the week of Monday, December 23, 2024 and in the week
+        # of Monday, December 30, 2024, which spans New Year
+        habit = Habit("Jog", "...", "weekly",
+                      completions=[datetime(2024, 12, 24, 10), datetime(2025, 1, 2, 10)])
+        self.assertFalse(habit.was_broken(datetime(2024, 12, 23), datetime(2025, 1, 5, 23)))
+        # The Monday of the following week is within the period, so that week is checked
+        self.assertTrue(habit.was_broken(datetime(2024, 12, 23), datetime(2025, 1, 6, 12)))
+        # A completion before the start of the period does not count for its week
+        self.assertTrue(habit.was_broken(datetime(2024, 12, 25, 10), datetime(2025, 1, 5)))
+        # A period ending before it starts has no weeks to miss
+        self.assertFalse(habit.was_broken(datetime(2025, 1, 5), datetime(2024, 12, 23)))
+
+        # One completion in 2024 covers the whole week spanning New Year
+        habit = Habit("Jog", "...", "weekly", completions=[datetime(2024, 12, 31, 10)])
+        self.assertFalse(habit.was_broken(datetime(2024, 12, 30), datetime(2025, 1, 5, 23)))
+
+    def test_completions_read_only(self):
+        """
+        Tests that the completions cannot be changed in place, past the day
+        ordinals kept for them.
+        """
+        habit = Habit("Read", "...", "daily")
+        with self.assertRaises(AttributeError):
+            habit.completions.append(datetime.now())
+        habit.completions = [datetime.now()]
+        self.assertEqual(habit.get_current_streak(), 1)
+
     def test_get_all_habits(self):
         """
         Tests retrieving all habits.
@@ -112,8 +180,35 @@ class TestHabitTracker(unittest.TestCase):
         self.tracker.add_habit("Jog", "...", "weekly")
         habits = self.tracker.get_all_habits()
         self.assertEqual(len(habits), 2)
-        self.assertIn("Read", [h.name for h in habits])
-        self.assertIn("Jog", [h.name for h in habits])
+        self.assertIn("Read", {h.name for h in habits})
+        self.assertIn("Jog", {h.name for h in habits})
+
+    def test_get_display_snapshot(self):
+        """
+        Tests the values prepared for the habit overview.
+        """
+        self.tracker.add_habit("Read", "...", "daily")
+        self.tracker.add_habit("Jog", "...", "weekly")
+        self.tracker.complete_habit("Read")
+        snapshot = self.tracker.get_display_snapshot()
+        self.assertEqual([entry["name"] for entry in snapshot], ["Read", "Jog"])
+        self.assertEqual(snapshot[0]["current_streak"], 1)
+        self.assertEqual(snapshot[0]["longest_streak"], 1)
+        self.assertEqual(snapshot[0]["last_completion"], self.tracker.get_habit_by_name("Read").completions[-1])
+        self.assertEqual(snapshot[1]["current_streak"], 0)
+        self.assertIsNone(snapshot[1]["last_completion"])
+
+    def test_delete_habit_duplicate_names(self):
+        """
+        Tests deleting a habit whose name occurs twice, e.g. in a hand-edited file.
+        """
+        self.tracker.habits = [Habit("Read", "...", "daily"), Habit("Jog", "...", "weekly"),
+                               Habit("Read", "...", "weekly")]
+        self.assertTrue(self.tracker.delete_habit("Read"))
+        self.assertEqual([h.name for h in self.tracker.habits], ["Jog"])
+        self.assertEqual(self.tracker.get_habits_by_period("weekly"), self.tracker.habits)
+        self.tracker.add_habit("Read", "...", "daily")
+        self.assertEqual(len(self.tracker.habits), 2)
 
     def test_get_habits_by_period(self):
         """
@@ -125,23 +220,29 @@ class TestHabitTracker(unittest.TestCase):
 
         daily_habits = self.tracker.get_habits_by_period("daily")
         self.assertEqual(len(daily_habits), 2)
-        self.assertIn("Read", [h.name for h in daily_habits])
-        self.assertIn("Walk", [h.name for h in daily_habits])
+        self.assertIn("Read", {h.name for h in daily_habits})
+        self.assertIn("Walk", {h.name for h in daily_habits})
 
         weekly_habits = self.tracker.get_habits_by_period("weekly")
         self.assertEqual(len(weekly_habits), 1)
-        self.assertIn("Jog", [h.name for h in weekly_habits])
+        self.assertIn("Jog", {h.name for h in weekly_habits})
+
+        # The periodicity is fixed, so the index cannot go stale
+        with self.assertRaises(AttributeError):
+            weekly_habits[0].periodicity = "daily"
 
     def test_save_and_load_data(self):
         """
         Tests saving and loading data.
         """
+        self._use_file_db()
         self.tracker.add_habit("Write", "Write daily", "daily")
         self.tracker.add_habit("Cook", "Cook weekly", "weekly")
-        self.tracker.complete_habit("Write", date=datetime.now() - timedelta(days=2))
-        self.tracker.complete_habit("Write", date=datetime.now() - timedelta(days=1))
-        self.tracker.complete_habit("Write", date=datetime.now())
-        self.tracker.complete_habit("Cook", date=datetime.now() - timedelta(weeks=1))
+        now = datetime.now()
+        self.tracker.complete_habit("Write", date=now - timedelta(days=2))
+        self.tracker.complete_habit("Write", date=now - timedelta(days=1))
+        self.tracker.complete_habit("Write", date=now)
+        self.tracker.complete_habit("Cook", date=now - timedelta(weeks=1))
 
         # Create a new tracker and load data
         new_db_manager = DB(self.test_db_file)
@@ -160,35 +261,125 @@ class TestHabitTracker(unittest.TestCase):
         self.assertEqual(cook_habit.periodicity, "weekly")
         self.assertEqual(len(cook_habit.completions), 1)
 
+    def test_batched_save(self):
+        """
+        Tests that changes within a batch are saved once the batch ends.
+        """
+        self._use_file_db()
+        with self.tracker.batched():
+            self.tracker.add_habit("Write", "Write daily", "daily")
+            self.tracker.add_habit("Cook", "Cook weekly", "weekly")
+            self.tracker.complete_habit("Write")
+            # Nothing has been saved yet
+            self.assertEqual(DB(self.test_db_file).load_data(), [])
+
+        new_tracker = HabitTracker(DB(self.test_db_file))
+        new_tracker.load_from_file()
+        self.assertEqual(len(new_tracker.habits), 2)
+        self.assertEqual(len(new_tracker.get_habit_by_name("Write").completions), 1)
+
+    def test_save_skipped_without_changes(self):
+        """
+        Tests that a batch without any change does not write the file, while
+        an explicit save always does.
+        """
+        self._use_file_db()
+        self.tracker.add_habit("Write", "Write daily", "daily")
+        self.tracker.load_from_file()
+        os.remove(self.test_db_file)
+        with self.tracker.batched():
+            self.tracker.complete_habits_bulk("Write", [])
+        self.assertFalse(os.path.exists(self.test_db_file))
+
+        self.tracker.get_habit_by_name("Write").mark_completed()
+        self.tracker.save_to_file()
+        self.assertEqual(len(self.db_manager.load_data()[0]["completions"]), 1)
+
+    def test_save_data_rewrites_file(self):
+        """
+        Tests that saving the same data again recreates a removed file.
+        """
+        self._use_file_db()
+        data = [{"name": "Write"}]
+        self.db_manager.save_data(data)
+        os.remove(self.test_db_file)
+        self.db_manager.save_data(data)
+        self.assertEqual(self.db_manager.load_data(), data)
+
+    def test_load_data_after_save(self):
+        """
+        Tests that loading after a save returns the saved data, even if the file
+        keeps its size and modification time.
+        """
+        self._use_file_db()
+        self.db_manager.save_data([{"last_completed": "2025-01-01"}])
+        st = os.stat(self.test_db_file)
+        self.db_manager.load_data()
+        self.db_manager.save_data([{"last_completed": "2025-01-02"}])
+        os.utime(self.test_db_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(self.db_manager.load_data(), [{"last_completed": "2025-01-02"}])
+
+    def test_failed_background_load(self):
+        """
+        Tests that the CLI stops, without saving, if loading the habits fails.
+        """
+        self._use_file_db()
+        self.tracker.add_habit("Write", "Write daily", "daily")
+        with open(self.test_db_file, 'rb') as f:
+            content = f.read()
+        # A second habit with a broken date makes loading fail
+        with open(self.test_db_file, 'wb') as f:
+            f.write(content[:-1] + b',{"name":"Cook","description":"","periodicity":"daily",'
+                                   b'"creation_date":"not-a-date","last_completed":null,"completions":[]}]')
+        with open(self.test_db_file, 'rb') as f:
+            content = f.read()
+
+        tracker = HabitTracker(DB(self.test_db_file))
+        loader = BackgroundLoader(tracker)
+        loader.start()
+        cli = CLI(tracker, loader)
+        with mock.patch('sys.stdin', io.StringIO("1\nNew\n\ndaily\n6\n")), \
+                mock.patch('sys.stdout', io.StringIO()):
+            with self.assertRaises(ValueError):
+                cli.run()
+        # The file is left untouched
+        with open(self.test_db_file, 'rb') as f:
+            self.assertEqual(f.read(), content)
+
     def test_longest_streak_daily(self):
         """
         Tests the longest streak for a daily habit.
         """
         self.tracker.add_habit("Daily Exercise", "...", "daily")
         habit = self.tracker.get_habit_by_name("Daily Exercise")
+        now = datetime.now()
 
         # Simulate a streak of 3 days (e.g., 3, 2, 1 days ago)
-        for i in range(3):
-            self.tracker.complete_habit("Daily Exercise", date=datetime.now() - timedelta(days=2 - i))
+        self.tracker.complete_habits_bulk("Daily Exercise", [now - timedelta(days=2 - i) for i in range(3)])
         self.assertEqual(habit.get_longest_streak(), 3)
 
         # Simulate a break and a new, shorter streak
         # (IMPORTANT: Do not use future dates here, so as not to falsify the longest streak)
         # Reset completions and add a longer streak
         habit.completions = []
-        for i in range(5):  # A streak of 5 days
-            self.tracker.complete_habit("Daily Exercise", date=datetime.now() - timedelta(days=4 - i))
+        # A streak of 5 days
+        self.tracker.complete_habits_bulk("Daily Exercise", [now - timedelta(days=4 - i) for i in range(5)])
         self.assertEqual(habit.get_longest_streak(), 5)  # Expected 5 for the new longest streak
 
         # Add a gap and then a shorter, new streak to check if the longest is retained
         # Example: A 2-day streak after a 3-day gap
-        gap_start_date = datetime.now() - timedelta(days=8)
+        gap_start_date = now - timedelta(days=8)
         self.tracker.complete_habit("Daily Exercise", date=gap_start_date)
         self.tracker.complete_habit("Daily Exercise", date=gap_start_date + timedelta(days=1))
 
         # The longest streak should still be 5, from the previous longer streak
         self.assertEqual(habit.get_longest_streak(), 5)
 
+        # A batch with an already completed day is rejected as a whole
+        with self.assertRaises(ValueError):
+            self.tracker.complete_habits_bulk("Daily Exercise", [now - timedelta(days=6), now])
+        self.assertEqual(len(habit.completions), 7)
+
     def test_longest_streak_weekly(self):
         """
         Tests the longest streak for a weekly habit.
@@ -207,10 +398,37 @@ class TestHabitTracker(unittest.TestCase):
 
         # Simulate a longer streak
         habit.completions = []  # Reset completions
-        for i in range(4):
-            self.tracker.complete_habit("Weekly Review", date=today - timedelta(weeks=3 - i, days=2))
+        self.tracker.complete_habits_bulk("Weekly Review",
+                                          [today - timedelta(weeks=3 - i, days=2) for i in range(4)])
         self.assertEqual(habit.get_longest_streak(), 4)
 
+    def test_longest_streak_weekly_year_change(self):
+        """
+        Tests the longest streak for a weekly habit across a year with 53 calendar weeks.
+        """
+        # 2020 has 53 ISO weeks: week 52 (Dec 21), week 53 (Dec 28), then week 1 of 2021 (Jan 4)
+        habit = Habit("Weekly Review", "...", "weekly",
+                      completions=[datetime(2020, 12, 21), datetime(2020, 12, 28), datetime(2021, 1, 4)])
+        self.assertEqual(habit.get_longest_streak(), 3)
+
+        # Skipping week 53 breaks the streak
+        habit = Habit("Weekly Review", "...", "weekly",
+                      completions=[datetime(2020, 12, 21), datetime(2021, 1, 4)])
+        self.assertEqual(habit.get_longest_streak(), 1)
+
+    def test_get_streaks(self):
+        """
+        Tests calculating the current and the longest streak together.
+        """
+        now = datetime.now()
+        # A 4-day streak a week ago, then a 2-day streak up to today
+        completions = [now - timedelta(days=d) for d in (10, 9, 8, 7, 1, 0)]
+        habit = Habit("Read", "...", "daily", completions=completions)
+        self.assertEqual(habit.get_streaks(now), (2, 4))
+        self.assertEqual(analytics.get_current_streak(habit, now), 2)
+        self.assertEqual(analytics.get_longest_run_streak([habit], now), [(habit, 4)])
+        self.assertEqual(Habit("Jog", "...", "weekly").get_streaks(now), (0, 0))
+
     def test_struggling_habits(self):
         """
         Tests the function for identifying "struggling habits".
@@ -222,14 +440,15 @@ class TestHabitTracker(unittest.TestCase):
         # Yoga completed for the last 30 days (to ensure it is NOT struggling)
         # The range must go forward 30 days, as timedelta(days=i) counts backwards.
         # Start is (today - 29 days) to (today - 0 days).
-        for i in range(30):
-            self.tracker.complete_habit("Yoga", date=datetime.now() - timedelta(days=29 - i))
+        now = datetime.now()
+        last_30_days = [now - timedelta(days=29 - i) for i in range(30)]
+        self.tracker.complete_habits_bulk("Yoga", last_30_days)
 
         # Breathing Exercise completed only once (should be struggling)
-        self.tracker.complete_habit("Breathing Exercise", date=datetime.now() - timedelta(days=25))
+        self.tracker.complete_habit("Breathing Exercise", date=now - timedelta(days=25))
 
         # Screen Break completed only once last week (should be struggling, as many weeks were missed)
-        self.tracker.complete_habit("Screen Break", date=datetime.now() - timedelta(weeks=1, days=2))
+        self.tracker.complete_habit("Screen Break", date=now - timedelta(weeks=1, days=2))
 
         struggling = self.tracker.get_struggling_habits(period_days=30)
         # self.tracker.get_struggling_habits() already returns a list of names
@@ -245,9 +464,7 @@ class TestHabitTracker(unittest.TestCase):
         # Optional: Test with no struggling habits
         self.tracker.habits = []  # Clear existing habits for new test
         self.tracker.add_habit("Super Habit", "Daily", "daily")
-        for i in range(30):
-            self.tracker.complete_habit("Super Habit",
-                                        date=datetime.now() - timedelta(days=29 - i))  # 30 consecutive days
+        self.tracker.complete_habits_bulk("Super Habit", last_30_days)  # 30 consecutive days
         no_struggling = self.tracker.get_struggling_habits(period_days=30)
         self.assertEqual(len(no_struggling), 0)
 